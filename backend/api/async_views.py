@@ -0,0 +1,224 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.cache import conditional_response
+from api.filters import RecipeFilter, search_ingredients
+from api.pagination import SetPagination
+from api.serializers import (IngredientSerializer, RecipeListSerializer,
+                             RecipeSerializer)
+from api.views import (CartViewSet, IngredientViewSet, RecipeViewSet,
+                       cart_etag, cart_lines, cart_response, cart_stats,
+                       recipe_cache_key, recipes_cache_key)
+from recipes.models import Ingredient, Recipe
+from recipes.search import ingredient_index
+
+
+async def get_user(request):
+    auth = request.headers.get('Authorization', '').split()
+    if not auth:
+        return AnonymousUser()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+    token = await Token.objects.select_related('user').filter(
+        key=auth[1]
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def async_view(view, handle):
+    async def wrapper(request, *args, **kwargs):
+        response = None
+        if request.method == 'GET':
+            response = await handle(request, *args, **kwargs)
+        if response is not None:
+            return response
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def cached(get_cache_key, build, cache_timeout, cache_max_age=None,
+           vary=()):
+    async def handle(request, *args, **kwargs):
+        if 'text/html' in request.headers.get('Accept', ''):
+            return None
+        user = await get_user(request)
+        if user is None:
+            return None
+        key = await sync_to_async(get_cache_key)(
+            request, user, *args, **kwargs
+        )
+        data = None if key is None else await cache.aget(key)
+        if data is None:
+            data = await build(api_request(request, user), *args, **kwargs)
+            if data is None:
+                return None
+            if key is not None:
+                await cache.aset(key, data, cache_timeout)
+        if key is None:
+            response = json_response(data)
+        else:
+            response = conditional_response(
+                request, key, lambda: json_response(data), cache_max_age
+            )
+        patch_vary_headers(response, vary)
+        return response
+
+    return handle
+
+
+def json_response(data):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type='application/json'
+    )
+
+
+def api_request(request, user):
+    request = Request(request)
+    request.user = user
+    return request
+
+
+async def load_subscriptions(request):
+    request._subscribed_authors = set()
+    if request.user.is_authenticated:
+        request._subscribed_authors.update([
+            author async for author in request.user.subscriber.values_list(
+                'author_id', flat=True
+            )
+        ])
+
+
+def filter_recipes(request):
+    filterset = RecipeFilter(
+        request.query_params,
+        queryset=Recipe.objects.with_related().with_user_flags(request.user),
+        request=request
+    )
+    return filterset.qs if filterset.is_valid() else None
+
+
+async def build_recipe_list(request):
+    if (request.query_params.get('pagination') == 'cursor'
+            or 'cursor' in request.query_params):
+        return None
+    queryset = await sync_to_async(filter_recipes)(request)
+    if queryset is None:
+        return None
+    pagination = SetPagination()
+    paginator = pagination.django_paginator_class(
+        queryset, pagination.get_page_size(request)
+    )
+    await paginator.acount()
+    try:
+        number = paginator.validate_number(
+            request.query_params.get(pagination.page_query_param, 1)
+        )
+    except InvalidPage:
+        return None
+    bottom = (number - 1) * paginator.per_page
+    recipes = [
+        recipe async for recipe in
+        queryset[bottom:bottom + paginator.per_page]
+    ]
+    if number > 1 and not recipes:
+        return None
+    await load_subscriptions(request)
+    pagination.request = request
+    pagination.cursor_paginator = None
+    pagination.page = paginator._get_page(recipes, number, paginator)
+    return pagination.get_paginated_response(RecipeListSerializer(
+        recipes, many=True, context={'request': request}
+    ).data).data
+
+
+async def build_recipe(request, pk):
+    recipe = await Recipe.objects.with_related().with_user_flags(
+        request.user
+    ).filter(pk=pk).afirst()
+    if recipe is None:
+        return None
+    await load_subscriptions(request)
+    return RecipeSerializer(recipe, context={'request': request}).data
+
+
+async def build_ingredient_list(request):
+    name = request.query_params.get(api_settings.SEARCH_PARAM)
+    if name and settings.INGREDIENT_SEARCH_INDEX:
+        ingredients = await ingredient_index.asearch(
+            name, settings.INGREDIENT_SEARCH_LIMIT
+        )
+    else:
+        queryset = Ingredient.objects.all()
+        if name:
+            queryset = search_ingredients(queryset, name)
+        ingredients = [ingredient async for ingredient in queryset]
+    return IngredientSerializer(ingredients, many=True).data
+
+
+async def download_shopping_cart(request):
+    user = await get_user(request)
+    if user is None or not user.is_authenticated:
+        return None
+    try:
+        renderer, _ = DefaultContentNegotiation().select_renderer(
+            Request(request),
+            [renderer() for renderer in CartViewSet.renderer_classes]
+        )
+    except NotAcceptable:
+        return None
+    cart = await sync_to_async(cart_stats)(user)
+    etag = cart_etag(renderer, cart)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    lines = [line async for line in cart_lines(user)]
+    return cart_response(renderer, cart, etag, lines)
+
+
+recipe_list = async_view(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'}),
+    cached(
+        lambda request, user: None if user.is_authenticated
+        else recipes_cache_key(request.GET),
+        build_recipe_list, RecipeViewSet.cache_timeout,
+        vary=('Authorization',)
+    )
+)
+recipe_detail = async_view(
+    RecipeViewSet.as_view({
+        'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+        'delete': 'destroy'
+    }),
+    cached(
+        lambda request, user, pk: None if user.is_authenticated
+        else recipe_cache_key(pk),
+        build_recipe, RecipeViewSet.cache_timeout,
+        vary=('Authorization',)
+    )
+)
+ingredient_list = async_view(
+    IngredientViewSet.as_view({'get': 'list'}),
+    cached(
+        lambda request, user: IngredientViewSet().get_cache_key(request),
+        build_ingredient_list, IngredientViewSet.cache_timeout,
+        IngredientViewSet.cache_max_age
+    )
+)
+shopping_cart_download = async_view(
+    CartViewSet.as_view(), download_shopping_cart
+)
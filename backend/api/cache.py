@@ -0,0 +1,66 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+
+
+def get_version(namespace):
+    key = f'version:{namespace}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        return cache.get(key)
+    return version
+
+
+def bump_version(*namespaces):
+    cache.set_many({
+        f'version:{namespace}': uuid4().hex for namespace in namespaces
+    }, None)
+
+
+def conditional_response(request, key, build, max_age=None):
+    etag = '"{}"'.format(md5(key.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    if max_age is not None:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+    cache_timeout = settings.REFERENCE_CACHE_TIMEOUT
+    cache_max_age = settings.REFERENCE_CACHE_MAX_AGE
+
+    def get_cache_key(self, request):
+        version = get_version(self.cache_namespace)
+        return f'{self.cache_namespace}:{version}:{request.get_full_path()}'
+
+    def cached_response(self, request, view, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = response.data
+            cache.set(key, data, self.cache_timeout)
+        return conditional_response(
+            request, key, lambda: Response(data), self.cache_max_age
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,119 @@
+import binascii
+from base64 import b64decode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+SIGNATURES = {
+    'JPEG': (b'\xff\xd8\xff',),
+    'PNG': (b'\x89PNG\r\n\x1a\n',),
+    'GIF': (b'GIF87a', b'GIF89a'),
+    'WEBP': (b'RIFF',),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+SAVE_OPTIONS = {'JPEG': {'quality': 95}, 'WEBP': {'quality': 95}}
+NO_METADATA = {'exif': b'', 'xmp': b'', 'comment': b''}
+CHUNK_SIZE = 64 * 1024
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    def __del__(self):
+        self.close()
+
+
+def sniff_format(head):
+    for image_format, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            if image_format == 'WEBP' and head[8:12] != b'WEBP':
+                continue
+            return image_format
+    return None
+
+
+class StreamingImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректная строка base64.',
+        'invalid_format': 'Поддерживаются только JPEG, PNG, GIF и WebP.',
+        'max_bytes': 'Размер изображения больше {max_bytes} байт.',
+        'max_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif getattr(data, 'size', None) is None:
+            self.fail('invalid')
+        elif data.size > settings.IMAGE_MAX_BYTES:
+            self.fail('max_bytes', max_bytes=settings.IMAGE_MAX_BYTES)
+        else:
+            image_format = self.check_format(data.read(16))
+            data.seek(0)
+            data.name = f'{uuid4()}.{EXTENSIONS[image_format]}'
+        self.check_pixels(data)
+        return self.strip_metadata(super().to_internal_value(data))
+
+    def decode(self, data):
+        start = data.find(',') + 1 if data.startswith('data:') else 0
+        if (len(data) - start) * 3 // 4 > settings.IMAGE_MAX_BYTES:
+            self.fail('max_bytes', max_bytes=settings.IMAGE_MAX_BYTES)
+        file = DecodedImageFile('image', None, 0, None)
+        image_format = None
+        try:
+            for offset in range(start, len(data), CHUNK_SIZE):
+                chunk = b64decode(data[offset:offset + CHUNK_SIZE],
+                                  validate=True)
+                if image_format is None:
+                    image_format = self.check_format(chunk)
+                file.write(chunk)
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_base64')
+        except serializers.ValidationError:
+            file.close()
+            raise
+        if image_format is None:
+            file.close()
+            self.fail('invalid_image')
+        file.size = file.tell()
+        file.name = f'{uuid4()}.{EXTENSIONS[image_format]}'
+        file.seek(0)
+        return file
+
+    def check_format(self, head):
+        image_format = sniff_format(head)
+        if image_format is None:
+            self.fail('invalid_format')
+        return image_format
+
+    def check_pixels(self, file):
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail('max_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
+
+    def strip_metadata(self, file):
+        with Image.open(file) as image:
+            if image.format == 'GIF':
+                file.seek(0)
+                return file
+            image_format = image.format
+            animated = getattr(image, 'is_animated', False)
+            icc_profile = image.info.get('icc_profile')
+            if not animated:
+                image = ImageOps.exif_transpose(image)
+            stripped = DecodedImageFile('image', None, 0, None)
+            image.save(stripped, image_format, save_all=animated,
+                       icc_profile=icc_profile, **NO_METADATA,
+                       **SAVE_OPTIONS.get(image_format, {}))
+        stripped.size = stripped.tell()
+        stripped.name = file.name
+        stripped.seek(0)
+        return stripped
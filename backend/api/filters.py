@@ -1,27 +1,108 @@
+from django import forms
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
+from api.cache import get_version
 from users.models import FoodgramUser
-from recipes.models import Recipe
+from recipes.models import Recipe, Tag
+from recipes.search import ingredient_index
+
+
+def tag_ids_by_slug():
+    key = f'tag-slugs:{get_version("tags")}'
+    tags = cache.get(key)
+    if tags is None:
+        tags = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tags, settings.REFERENCE_CACHE_TIMEOUT)
+    return tags
+
+
+class SlugsField(forms.MultipleChoiceField):
+    def valid_value(self, value):
+        return True
+
+
+class TagsFilter(filters.MultipleChoiceFilter):
+    field_class = SlugsField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tags = tag_ids_by_slug()
+        ids = [tags[slug] for slug in value if slug in tags]
+        if not ids:
+            return qs.none()
+        return qs.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=ids
+        )))
+
+
+def search_ingredients(queryset, name):
+    return queryset.filter(name__icontains=name).annotate(
+        is_prefix=Case(
+            When(name__istartswith=name, then=Value(0)),
+            default=Value(1)
+        )
+    ).order_by('is_prefix', 'name')[:settings.INGREDIENT_SEARCH_LIMIT]
+
+
+class IngredientSearchFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(api_settings.SEARCH_PARAM)
+        if not name or view.action != 'list':
+            return queryset
+        if settings.INGREDIENT_SEARCH_INDEX:
+            return ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            )
+        return search_ingredients(queryset, name)
 
 
 class RecipeFilter(filters.FilterSet):
     author = filters.ModelChoiceFilter(queryset=FoodgramUser.objects.all())
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagsFilter()
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='get_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'популярные'),), method='get_ordering'
+    )
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorite__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(shoppingcart__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(value, config='russian',
+                                search_type='websearch')
+            return queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-id')
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).annotate(rank=Case(
+            When(name__icontains=value, then=Value(1)),
+            default=Value(0)
+        )).order_by('-rank', '-id')
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by('-favorites_count', '-id')
+
     class Meta:
         model = Recipe
         fields = ('author', 'tags')
@@ -0,0 +1,121 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class EstimatedPage(Page):
+    def has_next(self):
+        return super().has_next() or (
+            self.paginator.estimated
+            and len(self) == self.paginator.per_page
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        if self.estimable(queryset):
+            estimate = self.estimate(
+                queryset.order_by().explain(format='json')
+            )
+            if estimate is not None:
+                return estimate
+        return queryset.count()
+
+    async def acount(self):
+        if 'count' not in self.__dict__:
+            queryset = self.object_list
+            estimate = None
+            if self.estimable(queryset):
+                estimate = self.estimate(
+                    await queryset.order_by().aexplain(format='json')
+                )
+            self.__dict__['count'] = (
+                await queryset.acount() if estimate is None else estimate
+            )
+        return self.count
+
+    def estimable(self, queryset):
+        return (
+            connections[queryset.db].vendor == 'postgresql'
+            and not queryset.query.has_filters()
+        )
+
+    def estimate(self, plan):
+        estimate = int(json.loads(plan)[0]['Plan']['Plan Rows'])
+        if estimate <= settings.PAGINATION_EXACT_COUNT_LIMIT:
+            return None
+        self.estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        if not self.count or not self.estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        page = self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+        if number > 1 and not page.object_list:
+            raise EmptyPage(_('That page contains no results'))
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+
+class SetPagination(PageNumberPagination):
+    page_size_query_param = 'limit'
+    django_paginator_class = EstimatedCountPaginator
+    cursor_pagination_class = IdCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if isinstance(queryset, QuerySet) and (
+            request.query_params.get('pagination') == 'cursor'
+            or 'cursor' in request.query_params
+        ):
+            ordering = getattr(view, 'cursor_ordering', '-id')
+            if queryset.query.order_by not in ((), (ordering,)):
+                raise ValidationError({'cursor': [
+                    'Курсорная пагинация недоступна при этой сортировке.'
+                ]})
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.cursor_paginator.ordering = ordering
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,106 @@
+import csv
+import json
+import os
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import renderers
+
+PDF_FONT = 'DejaVuSans'
+PDF_MARGIN = 50
+
+pdfmetrics.registerFont(TTFont(PDF_FONT, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'fonts', 'DejaVuSans.ttf'
+)))
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return '\r\n'.join(f'{key}: {value}' for key, value in data.items())
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'список покупок\r\n'
+        yield 'ингридиент (ед.) - количество'
+        for name, unit, amount in ingredients:
+            yield f'\r\n{name} ({unit}) - {amount}'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('ингредиент', 'единица измерения',
+                               'количество'))
+        for row in ingredients:
+            yield writer.writerow(row)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False)
+
+    def stream(self, ingredients):
+        separator = '['
+        for name, unit, amount in ingredients:
+            yield separator + json.dumps({
+                'name': name, 'measurement_unit': unit, 'amount': amount
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.build(f'{key}: {value}' for key, value in data.items())
+
+    def stream(self, ingredients):
+        yield self.build(
+            f'{name} ({unit}) - {amount}' for name, unit, amount in ingredients
+        )
+
+    def build(self, lines):
+        buffer = BytesIO()
+        width, height = A4
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle('Список покупок')
+        pdf.setFont(PDF_FONT, 16)
+        pdf.drawString(PDF_MARGIN, height - PDF_MARGIN, 'Список покупок')
+        pdf.setFont(PDF_FONT, 12)
+        top = height - PDF_MARGIN - 30
+        for line in lines:
+            for part in simpleSplit(line, PDF_FONT, 12,
+                                    width - 2 * PDF_MARGIN):
+                if top < PDF_MARGIN:
+                    pdf.showPage()
+                    pdf.setFont(PDF_FONT, 12)
+                    top = height - PDF_MARGIN
+                pdf.drawString(PDF_MARGIN, top, part)
+                top -= 18
+        pdf.save()
+        return buffer.getvalue()
@@ -1,11 +1,26 @@
-from drf_extra_fields.fields import Base64ImageField
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
+from api.fields import StreamingImageField
+from recipes.images import rendition_url, rendition_urls
 from recipes.models import (Ingredient, Tag, Recipe, Favorite,
-                            RecipeIngredient, ShoppingCart)
+                            RecipeIngredient, ShoppingCart, ShoppingCartLine)
 from users.models import FoodgramUser
 
 
+def subscribed_authors(request):
+    if not hasattr(request, '_subscribed_authors'):
+        request._subscribed_authors = set()
+        if request.user.is_authenticated:
+            request._subscribed_authors.update(
+                request.user.subscriber.values_list('author_id', flat=True)
+            )
+    return request._subscribed_authors
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -15,9 +30,7 @@ class AuthorSerializer(serializers.ModelSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        if not self.context['request'].user.is_authenticated:
-            return False
-        return self.context['request'].user.subscriber.all().exists()
+        return obj.id in subscribed_authors(self.context['request'])
 
 
 class SubscribeSerializer(AuthorSerializer):
@@ -30,20 +43,19 @@ class SubscribeSerializer(AuthorSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        recipes_limit_default = 3
-        if 'recipes_limit' in self.context['request'].query_params.keys():
-            recipes_limit = self.context['request'].query_params[
-                'recipes_limit'
-            ]
-        else:
-            recipes_limit = recipes_limit_default
-        return FavoriteSerializer(
-            Recipe.objects.filter(author=obj)[:int(recipes_limit)],
-            many=True
-        ).data
+        return FavoriteSerializer(obj.recipes_preview, many=True).data
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    recipes_limit = serializers.IntegerField(
+        min_value=0, default=settings.RECIPES_LIMIT
+    )
+
+    def validate_recipes_limit(self, value):
+        return min(value, settings.RECIPES_LIMIT_MAX)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -79,7 +91,58 @@ def set_ingredients(recipe, ingredients):
         amount=ingredient['amount']) for ingredient in ingredients])
 
 
-def in_list(self, obj, model):
+def update_ingredients(recipe, ingredients):
+    amounts = {}
+    for ingredient in ingredients:
+        amounts[ingredient['ingredient'].id] = (
+            amounts.get(ingredient['ingredient'].id, 0)
+            + ingredient['amount']
+        )
+    delta = dict(amounts)
+    rows = {}
+    stale = []
+    for row in RecipeIngredient.objects.filter(recipe=recipe):
+        delta[row.ingredient_id] = (
+            delta.get(row.ingredient_id, 0) - row.amount
+        )
+        if row.ingredient_id in rows or row.ingredient_id not in amounts:
+            stale.append(row.id)
+        else:
+            rows[row.ingredient_id] = row
+    changed = []
+    for ingredient, row in rows.items():
+        if row.amount != amounts[ingredient]:
+            row.amount = amounts[ingredient]
+            changed.append(row)
+    if stale:
+        RecipeIngredient.objects.filter(id__in=stale).delete()
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=ingredient, amount=amount
+        ) for ingredient, amount in amounts.items() if ingredient not in rows
+    ])
+    return {
+        ingredient: amount for ingredient, amount in delta.items() if amount
+    }
+
+
+def update_tags(recipe, tags):
+    current = set(recipe.tags.values_list('id', flat=True))
+    tags = {tag.id for tag in tags}
+    if current == tags:
+        return False
+    if current - tags:
+        recipe.tags.remove(*(current - tags))
+    if tags - current:
+        recipe.tags.add(*(tags - current))
+    return True
+
+
+def in_list(self, obj, model, annotation):
+    if hasattr(obj, annotation):
+        return getattr(obj, annotation)
     if not self.context['request'].user.is_authenticated:
         return False
     return model.objects.filter(
@@ -87,30 +150,90 @@ def in_list(self, obj, model):
     ).exists()
 
 
+class ImageRenditionField(serializers.ReadOnlyField):
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, recipe):
+        url = rendition_url(recipe, self.size)
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        if request is None:
+            return rendition_urls(recipe)
+        return {
+            size: {extension: request.build_absolute_uri(url)
+                   for extension, url in urls.items()}
+            for size, urls in rendition_urls(recipe).items()
+        }
+
+
+class RecipeIngredientWriteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    amount = serializers.IntegerField(min_value=1)
+
+
+def objects_by_ids(model, ids, field):
+    duplicates = sorted(id for id, count in Counter(ids).items() if count > 1)
+    if duplicates:
+        raise serializers.ValidationError({field: [
+            f'Повторяются id: {", ".join(map(str, duplicates))}.'
+        ]})
+    objects = model.objects.order_by().in_bulk(ids)
+    missing = [id for id in ids if id not in objects]
+    if missing:
+        raise serializers.ValidationError({field: [
+            f'Не найдены id: {", ".join(map(str, missing))}.'
+        ]})
+    return objects
+
+
 class RecipePostSerializer(serializers.ModelSerializer):
-    author = AuthorSerializer(read_only=True)
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = StreamingImageField(max_length=None, use_url=True)
     cooking_time = serializers.IntegerField(min_value=1)
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True)
-    ingredients = RecipeIngredientSerializer(
-        many=True, source='ingredient_recipe'
-    )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1))
+    ingredients = RecipeIngredientWriteSerializer(many=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+        fields = ('tags', 'ingredients', 'name', 'image', 'text',
                   'cooking_time')
 
-    def get_is_favorited(self, obj):
-        return in_list(self, obj, Favorite)
+    def validate(self, attrs):
+        if 'tags' in attrs:
+            tags = objects_by_ids(Tag, attrs['tags'], 'tags')
+            attrs['tags'] = [tags[tag] for tag in attrs['tags']]
+        if 'ingredients' in attrs:
+            ingredients = attrs.pop('ingredients')
+            objects = objects_by_ids(
+                Ingredient,
+                [ingredient['id'] for ingredient in ingredients],
+                'ingredients'
+            )
+            attrs['ingredient_recipe'] = [
+                {'ingredient': objects[ingredient['id']],
+                 'amount': ingredient['amount']}
+                for ingredient in ingredients
+            ]
+        return attrs
 
-    def get_is_in_shopping_cart(self, obj):
-        return in_list(self, obj, ShoppingCart)
+    def to_representation(self, instance):
+        instance = Recipe.objects.with_related().with_user_flags(
+            self.context['request'].user
+        ).get(pk=instance.pk)
+        return RecipeSerializer(instance, context=self.context).data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredient_recipe')
         tags = validated_data.pop('tags')
@@ -119,26 +242,32 @@ class RecipePostSerializer(serializers.ModelSerializer):
         set_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredient_recipe')
-        tags = validated_data.pop('tags')
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.image = validated_data.get('image', instance.image)
-        instance.cooking_time = validated_data.get(
-            'cooking_time',
-            instance.cooking_time
-        )
-        instance.save()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        instance.tags.set(tags)
-        set_ingredients(instance, ingredients)
+        Recipe.objects.filter(pk=instance.pk).lock()
+        ingredients = validated_data.pop('ingredient_recipe', None)
+        tags = validated_data.pop('tags', None)
+        update_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in update_fields:
+            setattr(instance, field, validated_data[field])
+        amounts = {}
+        if ingredients is not None:
+            amounts = update_ingredients(instance, ingredients)
+        tags_changed = tags is not None and update_tags(instance, tags)
+        if update_fields or amounts or tags_changed:
+            instance.save(update_fields=update_fields + ['modified'])
+        ShoppingCartLine.objects.change_recipe_amounts(instance, amounts)
         return instance
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
     tags = TagSerializer(many=True)
+    image = ImageRenditionField('detail')
+    images = ImageRenditionsField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
@@ -146,21 +275,66 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+                  'is_in_shopping_cart', 'name', 'image', 'images', 'text',
                   'cooking_time')
 
     def get_is_favorited(self, obj):
-        return in_list(self, obj, Favorite)
+        return in_list(self, obj, Favorite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        return in_list(self, obj, ShoppingCart)
+        return in_list(self, obj, ShoppingCart, 'is_in_shopping_cart')
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(recipe=obj)
-        return RecipeIngredientSerializer(ingredients, many=True).data
+        return RecipeIngredientSerializer(
+            obj.ingredient_recipe.all(), many=True
+        ).data
+
+
+class RecipeListSerializer(RecipeSerializer):
+    image = ImageRenditionField('card')
+
+
+class PantryRecipeSerializer(RecipeListSerializer):
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + ('coverage',)
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.PANTRY_INGREDIENTS_MAX
+    )
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
+    image = ImageRenditionField('thumb')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_MAX
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class CartQuantitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(
+        min_value=1, max_value=settings.CART_QUANTITY_MAX, default=1
+    )
+
+
+class CartQuantityUpdateSerializer(CartQuantitySerializer):
+    quantity = serializers.IntegerField(
+        min_value=1, max_value=settings.CART_QUANTITY_MAX
+    )
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_version
+from recipes.images import renditions_created
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import ingredients_changed
+from users.models import FoodgramUser
+
+
+def invalidate_recipes(*recipes):
+    transaction.on_commit(lambda: bump_version(
+        'recipes', *(f'recipe:{recipe}' for recipe in recipes)
+    ))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags_cache(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('tags'))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_changed, sender=Ingredient)
+def invalidate_ingredients_cache(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('ingredients'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    invalidate_recipes(instance.pk)
+
+
+@receiver(renditions_created, sender=Recipe)
+def invalidate_recipe_renditions_cache(sender, recipe, **kwargs):
+    invalidate_recipes(recipe)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredients_cache(sender, instance, **kwargs):
+    invalidate_recipes(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags_cache(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        invalidate_recipes(*(pk_set or ()))
+    else:
+        invalidate_recipes(instance.pk)
+
+
+@receiver(post_save, sender=FoodgramUser)
+def invalidate_author_cache(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_recipes(*instance.recipes.values_list('id', flat=True))
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+
+from api import async_views
+
+
+@pytest.fixture
+def token(users):
+    return Token.objects.create(user=users[0])
+
+
+def get(view, path, data=None, token=None, **kwargs):
+    headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'} if token else {}
+    request = RequestFactory().get(path, data, **headers)
+    response = async_to_sync(view)(request, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+@pytest.mark.parametrize('data', [
+    {'limit': 5}, {'limit': 5, 'page': 2}, {'tags': ['tag2']},
+    {'is_favorited': 1}, {'page': 99}
+])
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_recipe_list_matches_sync_view(client, user_client, token, recipes,
+                                       data, authenticated):
+    expected = (user_client if authenticated else client).get(
+        '/api/recipes/', data
+    )
+    for _ in range(2):
+        response = get(async_views.recipe_list, '/api/recipes/', data,
+                       token if authenticated else None)
+        assert response.status_code == expected.status_code
+        assert json.loads(response.content) == expected.json()
+
+
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_recipe_detail_matches_sync_view(client, user_client, token, recipes,
+                                         authenticated):
+    path = f'/api/recipes/{recipes[2].id}/'
+    expected = (user_client if authenticated else client).get(path)
+    response = get(async_views.recipe_detail, path, None,
+                   token if authenticated else None, pk=recipes[2].id)
+    assert response.status_code == 200
+    assert json.loads(response.content) == expected.json()
+
+
+def test_recipe_detail_missing(client, recipes):
+    response = get(async_views.recipe_detail, '/api/recipes/0/', pk=0)
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('index', [False, True])
+def test_ingredient_list_matches_sync_view(client, ingredients, settings,
+                                           index):
+    settings.INGREDIENT_SEARCH_INDEX = index
+    for data in ({}, {'name': 'продукт 1'}):
+        expected = client.get('/api/ingredients/', data)
+        response = get(async_views.ingredient_list, '/api/ingredients/', data)
+        assert json.loads(response.content) == expected.json()
@@ -0,0 +1,59 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingCartLine
+from recipes.signals import COUNTERS
+
+
+def statuses(response):
+    assert response.status_code == 200, response.data
+    return [row['status'] for row in response.data['results']]
+
+
+def assert_consistent(user):
+    for model, counter in COUNTERS.items():
+        for recipe in Recipe.objects.all():
+            assert getattr(recipe, counter) == model.objects.filter(
+                recipe=recipe
+            ).count()
+    assert ShoppingCartLine.objects.rebuild([user.id]) == 0
+
+
+@pytest.mark.parametrize('model, path', [
+    (Favorite, '/api/recipes/favorite/'),
+    (ShoppingCart, '/api/recipes/shopping_cart/'),
+])
+def test_bulk_add_and_delete(user_client, users, recipes, model, path):
+    present = model.objects.get(user=users[0]).recipe_id
+    missing = recipes[-1].id + 1
+    ids = [present, recipes[5].id, recipes[6].id, missing, recipes[5].id]
+    assert statuses(user_client.post(
+        path, {'recipes': ids}, format='json'
+    )) == ['exists', 'added', 'added', 'not_found']
+    assert set(model.objects.filter(user=users[0]).values_list(
+        'recipe', flat=True
+    )) == {present, recipes[5].id, recipes[6].id}
+    assert_consistent(users[0])
+    assert statuses(user_client.delete(
+        path, {'recipes': [recipes[5].id, recipes[7].id]}, format='json'
+    )) == ['removed', 'absent']
+    assert set(model.objects.filter(user=users[0]).values_list(
+        'recipe', flat=True
+    )) == {present, recipes[6].id}
+    assert_consistent(users[0])
+
+
+@pytest.mark.parametrize('ids', [[], [0], list(range(1, 102))])
+def test_bulk_ids_are_validated(user_client, recipes, ids):
+    response = user_client.post('/api/recipes/favorite/',
+                                {'recipes': ids}, format='json')
+    assert response.status_code == 400
+
+
+def test_clear_shopping_cart(user_client, users, recipes):
+    user_client.post('/api/recipes/shopping_cart/',
+                     {'recipes': [recipes[5].id]}, format='json')
+    response = user_client.delete('/api/recipes/shopping_cart/clear/')
+    assert response.status_code == 204
+    assert not ShoppingCart.objects.filter(user=users[0]).exists()
+    assert not users[0].cart_lines.exists()
+    assert_consistent(users[0])
@@ -0,0 +1,128 @@
+import base64
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from recipes.models import Recipe, Tag
+
+
+def png(size=(20, 20)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def encoded(content, header='data:image/png;base64,'):
+    return header + base64.b64encode(content).decode()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def create_recipe(client, ingredients, image):
+    return client.post('/api/recipes/', {
+        'name': 'новый рецепт', 'text': 'текст', 'cooking_time': 5,
+        'tags': [Tag.objects.first().id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+        'image': image,
+    }, format='json')
+
+
+@pytest.mark.parametrize('header', ['data:image/png;base64,', ''])
+def test_base64_image(user_client, recipes, ingredients, header):
+    response = create_recipe(user_client, ingredients,
+                             encoded(png(), header))
+    assert response.status_code == 201, response.data
+
+
+def test_oversized_base64(user_client, recipes, ingredients, settings):
+    settings.IMAGE_MAX_BYTES = 50
+    response = create_recipe(user_client, ingredients, encoded(png()))
+    assert response.status_code == 400
+    assert 'байт' in str(response.data['image'][0])
+
+
+def test_too_many_pixels(user_client, recipes, ingredients, settings):
+    settings.IMAGE_MAX_PIXELS = 100
+    response = create_recipe(user_client, ingredients, encoded(png()))
+    assert response.status_code == 400
+    assert 'пикселей' in str(response.data['image'][0])
+
+
+@pytest.mark.parametrize('content', [b'not an image at all', b'\x89PNG\r\n'])
+def test_non_image_base64(user_client, recipes, ingredients, content):
+    response = create_recipe(user_client, ingredients, encoded(content))
+    assert response.status_code == 400
+    assert 'image' in response.data
+
+
+def test_invalid_base64(user_client, recipes, ingredients):
+    response = create_recipe(user_client, ingredients,
+                             'data:image/png;base64,@@')
+    assert response.status_code == 400
+    assert 'base64' in str(response.data['image'][0])
+
+
+def test_multipart_upload(user_client, recipes, ingredients):
+    response = user_client.post('/api/recipes/', {
+        'name': 'новый рецепт', 'text': 'текст', 'cooking_time': 5,
+        'tags': [Tag.objects.first().id],
+        'ingredients[0]id': ingredients[0].id,
+        'ingredients[0]amount': 10,
+        'image': SimpleUploadedFile('photo.png', png(), 'image/png'),
+    }, format='multipart')
+    assert response.status_code == 201, response.data
+    assert response.data['ingredients'][0]['amount'] == 10
+
+
+@pytest.mark.parametrize('max_bytes, content', [
+    (5 * 1024 * 1024, b'text'), (50, png())
+])
+def test_multipart_rejected(user_client, recipes, ingredients, settings,
+                            max_bytes, content):
+    settings.IMAGE_MAX_BYTES = max_bytes
+    response = user_client.post('/api/recipes/', {
+        'name': 'новый рецепт', 'text': 'текст', 'cooking_time': 5,
+        'tags': [Tag.objects.first().id],
+        'ingredients[0]id': ingredients[0].id,
+        'ingredients[0]amount': 10,
+        'image': SimpleUploadedFile('photo.png', content, 'image/png'),
+    }, format='multipart')
+    assert response.status_code == 400
+    assert 'image' in response.data
+
+
+def jpeg_with_exif():
+    exif = Image.Exif()
+    exif[0x010f] = 'Camera'
+    exif[0x0112] = 6
+    exif.get_ifd(0x8825)[2] = (55.0, 45.0, 0.0)
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 20), 'red').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('multipart', [False, True])
+def test_original_is_stored_without_metadata(user_client, recipes,
+                                             ingredients, multipart):
+    content = jpeg_with_exif()
+    assert Image.open(io.BytesIO(content)).getexif()
+    if multipart:
+        response = user_client.post('/api/recipes/', {
+            'name': 'новый рецепт', 'text': 'текст', 'cooking_time': 5,
+            'tags': [Tag.objects.first().id],
+            'ingredients[0]id': ingredients[0].id,
+            'ingredients[0]amount': 10,
+            'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+        }, format='multipart')
+    else:
+        response = create_recipe(user_client, ingredients, encoded(content))
+    assert response.status_code == 201, response.data
+    recipe = Recipe.objects.get(pk=response.data['id'])
+    with Image.open(recipe.image) as image:
+        assert not image.getexif()
+        assert image.size == (20, 40)
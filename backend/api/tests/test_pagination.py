@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.db.models import QuerySet
+
+from api.pagination import EstimatedCountPaginator
+from recipes.models import Recipe
+
+
+def estimated_paginator(estimate):
+    paginator = EstimatedCountPaginator(Recipe.objects.all(), 5)
+    paginator.__dict__['count'] = estimate
+    paginator.estimated = True
+    return paginator
+
+
+def test_underestimated_count_keeps_existing_pages(recipes):
+    paginator = estimated_paginator(3)
+    assert paginator.page(2).has_next()
+    page = paginator.page(3)
+    assert len(page) == 2
+    assert not page.has_next()
+    with pytest.raises(EmptyPage):
+        paginator.page(4)
+
+
+def test_overestimated_count_rejects_empty_pages(recipes):
+    paginator = estimated_paginator(100)
+    assert len(paginator.page(3)) == 2
+    with pytest.raises(EmptyPage):
+        paginator.page(5)
+
+
+@pytest.fixture
+def planner(recipes, monkeypatch, settings):
+    settings.PAGINATION_EXACT_COUNT_LIMIT = 5
+    monkeypatch.setattr(connection, 'vendor', 'postgresql')
+    monkeypatch.setattr(
+        QuerySet, 'explain',
+        lambda self, **options: json.dumps([{'Plan': {'Plan Rows': 1000}}])
+    )
+
+
+def test_unfiltered_count_is_estimated(planner):
+    paginator = EstimatedCountPaginator(Recipe.objects.all(), 5)
+    assert paginator.count == 1000
+    assert paginator.estimated
+
+
+def test_filtered_count_is_exact(planner, users):
+    paginator = EstimatedCountPaginator(
+        Recipe.objects.filter(author=users[0]), 5
+    )
+    assert paginator.count == 3
+    assert not paginator.estimated
+
+
+def test_cursor_pagination(client, recipes):
+    response = client.get('/api/recipes/', {'pagination': 'cursor',
+                                            'limit': 5})
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        recipe.id for recipe in reversed(recipes[-5:])
+    ]
+
+
+def test_cursor_pagination_rejects_custom_ordering(client, recipes):
+    response = client.get('/api/recipes/', {'pagination': 'cursor',
+                                            'ordering': 'popular'})
+    assert response.status_code == 400
+    assert 'cursor' in response.data
@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.mark.parametrize('limit', [2, 6, 12])
+def test_anonymous_recipe_list(client, recipes, limit,
+                               django_assert_num_queries):
+    with django_assert_num_queries(4):
+        response = client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.parametrize('limit', [2, 6, 12])
+def test_authenticated_recipe_list(user_client, recipes, limit,
+                                   django_assert_num_queries):
+    with django_assert_num_queries(5):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+def test_anonymous_recipe_detail(client, recipes, django_assert_num_queries):
+    with django_assert_num_queries(3):
+        response = client.get(f'/api/recipes/{recipes[3].id}/')
+    assert response.status_code == 200
+
+
+def test_authenticated_recipe_detail(user_client, recipes,
+                                     django_assert_num_queries):
+    with django_assert_num_queries(4):
+        response = user_client.get(f'/api/recipes/{recipes[2].id}/')
+    assert response.status_code == 200
+    assert response.data['is_in_shopping_cart'] is True
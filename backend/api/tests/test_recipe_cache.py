@@ -0,0 +1,30 @@
+def test_recipe_cache_follows_ingredient_names(
+    client, recipes, django_capture_on_commit_callbacks
+):
+    path = f'/api/recipes/{recipes[3].id}/'
+    assert client.get(path).status_code == 200
+    assert client.get('/api/recipes/').status_code == 200
+    ingredient = recipes[3].ingredients.first()
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = 'новое имя'
+        ingredient.save()
+    assert 'новое имя' in {
+        item['name'] for item in client.get(path).data['ingredients']
+    }
+    assert 'новое имя' in {
+        item['name']
+        for recipe in client.get('/api/recipes/').data['results']
+        for item in recipe['ingredients']
+    }
+
+
+def test_popular_order_is_not_cached(client, users, recipes):
+    params = {'ordering': 'popular', 'limit': 3}
+    first = [recipe['id'] for recipe in
+             client.get('/api/recipes/', params).data['results']]
+    assert first[0] == recipes[1].id
+    for user in users[1:]:
+        user.favorite_user.create(recipe=recipes[6])
+    popular = [recipe['id'] for recipe in
+               client.get('/api/recipes/', params).data['results']]
+    assert popular[0] == recipes[6].id
@@ -0,0 +1,62 @@
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def patch_recipe(client, recipe, data):
+    with CaptureQueriesContext(connection) as context:
+        response = client.patch(f'/api/recipes/{recipe.id}/', data,
+                                format='json')
+    assert response.status_code == 200, response.data
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith(WRITES)
+    ]
+
+
+def current_payload(recipe):
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': list(recipe.tags.values_list('id', flat=True)),
+        'ingredients': [
+            {'id': row.ingredient_id, 'amount': row.amount}
+            for row in recipe.ingredient_recipe.all()
+        ],
+    }
+
+
+def test_unchanged_patch_writes_nothing(user_client, recipes):
+    assert patch_recipe(
+        user_client, recipes[0], current_payload(recipes[0])
+    ) == []
+
+
+def test_ingredient_diff_uses_one_statement_per_kind(user_client, recipes,
+                                                     ingredients):
+    recipe = recipes[0]
+    payload = current_payload(recipe)
+    removed, changed, kept = payload['ingredients']
+    payload['ingredients'] = [
+        {'id': changed['id'], 'amount': changed['amount'] + 5},
+        kept,
+        {'id': ingredients[5].id, 'amount': 15},
+    ]
+    writes = patch_recipe(user_client, recipe, payload)
+    assert Counter(
+        sql.split()[0] for sql in writes
+        if '"recipes_recipeingredient"' in sql.split()[:3]
+    ) == {'INSERT': 1, 'UPDATE': 1, 'DELETE': 1}
+    amounts = dict(recipe.ingredient_recipe.values_list(
+        'ingredient', 'amount'
+    ))
+    assert removed['id'] not in amounts
+    assert amounts == {
+        changed['id']: changed['amount'] + 5,
+        kept['id']: kept['amount'],
+        ingredients[5].id: 15,
+    }
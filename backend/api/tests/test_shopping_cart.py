@@ -0,0 +1,54 @@
+from django.contrib import admin
+
+from recipes.admin import RecipeIngredientAdmin
+from recipes.models import RecipeIngredient
+
+
+def download(client, accept):
+    response = client.get('/api/recipes/download_shopping_cart/',
+                          HTTP_ACCEPT=accept)
+    assert response.status_code == 200
+    return response, b''.join(response.streaming_content)
+
+
+def test_text_download(user_client, recipes):
+    response, content = download(user_client, 'text/plain')
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert 'продукт 2 (г) - 10' in content.decode()
+
+
+def test_pdf_download(user_client, recipes):
+    response, content = download(user_client, 'application/pdf')
+    assert response['Content-Type'] == 'application/pdf'
+    assert response['Content-Disposition'].endswith('shop-list.pdf"')
+    assert content.startswith(b'%PDF')
+
+
+def test_patch_requires_quantity(user_client, recipes):
+    path = f'/api/recipes/{recipes[2].id}/shopping_cart/'
+    assert user_client.patch(path, {'quantity': 3}).data['quantity'] == 3
+    response = user_client.patch(path, {})
+    assert response.status_code == 400
+    assert 'quantity' in response.data
+    assert recipes[2].shoppingcart_set.get().quantity == 3
+
+
+def test_etag_follows_cart_lines(user_client, recipes,
+                                 django_capture_on_commit_callbacks):
+    response, _ = download(user_client, 'text/plain')
+    etag = response['ETag']
+    line = RecipeIngredient.objects.filter(recipe=recipes[2]).first()
+    line.amount = 999
+    RecipeIngredientAdmin(RecipeIngredient, admin.site).save_model(
+        None, line, None, False
+    )
+    response, content = download(user_client, 'text/plain')
+    assert response['ETag'] != etag
+    assert f'{line.ingredient.name} (г) - 999' in content.decode()
+    etag = response['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        line.ingredient.name = 'новое имя'
+        line.ingredient.save()
+    response, content = download(user_client, 'text/plain')
+    assert response['ETag'] != etag
+    assert 'новое имя (г) - 999' in content.decode()
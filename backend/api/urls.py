@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (IngredientViewSet, TagViewSet,
-                       RecipeViewSet, favorite,
-                       shopping_cart, SubscriptionsViewSet, CartViewSet)
+                       RecipeViewSet, favorite, favorites,
+                       shopping_cart, shopping_carts, clear_shopping_cart,
+                       SubscriptionsViewSet, CartViewSet)
 
 
 router = DefaultRouter()
@@ -20,8 +22,22 @@ urlpatterns = [
     path('users/<int:pk>/subscribe/', subscribe, name='subscribe-detail'),
     path('recipes/<int:pk>/favorite/', favorite),
     path('recipes/<int:pk>/shopping_cart/', shopping_cart),
+    path('recipes/favorite/', favorites),
+    path('recipes/shopping_cart/', shopping_carts),
+    path('recipes/shopping_cart/clear/', clear_shopping_cart),
     path('recipes/download_shopping_cart/', CartViewSet.as_view()),
     path('auth/', include('djoser.urls.authtoken')),
     path('', include('djoser.urls')),
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_VIEWS:
+    from api import async_views
+
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list),
+        path('recipes/<int:pk>/', async_views.recipe_detail),
+        path('recipes/download_shopping_cart/',
+             async_views.shopping_cart_download),
+        path('ingredients/', async_views.ingredient_list),
+    ] + urlpatterns
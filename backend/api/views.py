@@ -1,51 +1,112 @@
-from django.http import HttpResponse
-from django.db.models import Sum
+from hashlib import md5
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import urlencode
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
-from rest_framework import status, viewsets, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly,
                                         SAFE_METHODS)
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
 
 from users.models import FoodgramUser, Subscribe
 from recipes.models import (Ingredient, Tag, Recipe, Favorite,
-                            ShoppingCart, RecipeIngredient)
-from api.filters import RecipeFilter
+                            ShoppingCart, ShoppingCartLine, recipe_amounts)
+from api.cache import CachedResponseMixin, get_version
+from api.filters import IngredientSearchFilter, RecipeFilter
+from api.pagination import SetPagination
+from api.renderers import (TextShoppingListRenderer,
+                           CSVShoppingListRenderer,
+                           JSONShoppingListRenderer,
+                           PDFShoppingListRenderer)
 from api.serializers import (IngredientSerializer, TagSerializer,
                              RecipeSerializer, FavoriteSerializer,
-                             SubscribeSerializer, RecipePostSerializer)
-
+                             SubscribeSerializer, RecipePostSerializer,
+                             RecipesLimitSerializer, PantrySerializer,
+                             PantryRecipeSerializer, RecipeListSerializer,
+                             RecipeIdsSerializer, CartQuantitySerializer,
+                             CartQuantityUpdateSerializer)
+from recipes.search import pantry_index
+from recipes.signals import COUNTERS
+from recipes.units import merge_lines
 
-class SetPagination(PageNumberPagination):
-    page_size_query_param = 'limit'
 
-
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'ingredients'
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name']
+    filter_backends = [IngredientSearchFilter]
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+RECIPE_CACHE_QUERY_PARAMS = ('page', 'limit', 'tags', 'author', 'pagination',
+                             'cursor')
+
+
+def reference_versions():
+    return f'{get_version("tags")}:{get_version("ingredients")}'
+
+
+def recipe_cache_key(pk):
+    return f'recipe:{pk}:{get_version(f"recipe:{pk}")}:{reference_versions()}'
+
+
+def recipes_cache_key(params):
+    if set(params) - set(RECIPE_CACHE_QUERY_PARAMS) - {
+        'is_favorited', 'is_in_shopping_cart'
+    }:
+        return None
+    query = urlencode([
+        (name, value) for name in RECIPE_CACHE_QUERY_PARAMS
+        for value in sorted(params.getlist(name))
+    ])
+    return f'recipes:{get_version("recipes")}:{reference_versions()}:{query}'
+
+
+class RecipeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_namespace = 'recipes'
+    cache_timeout = settings.RECIPE_CACHE_TIMEOUT
+    cache_max_age = None
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Recipe.objects.all()
     filterset_class = RecipeFilter
     pagination_class = SetPagination
 
+    def get_cache_key(self, request):
+        if request.user.is_authenticated:
+            return None
+        if self.action == 'retrieve':
+            return recipe_cache_key(self.kwargs['pk'])
+        return recipes_cache_key(request.query_params)
+
+    def cached_response(self, request, view, *args, **kwargs):
+        response = super().cached_response(request, view, *args, **kwargs)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def get_queryset(self):
+        return Recipe.objects.with_related().with_user_flags(
+            self.request.user
+        )
+
     def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipeListSerializer
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return RecipePostSerializer
@@ -53,23 +114,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, url_path='what_to_cook')
+    def what_to_cook(self, request):
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        page = self.paginate_queryset(
+            pantry_index.rank(serializer.validated_data['ingredients'])
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe for recipe, _ in page]
+        )
+        results = []
+        for recipe, coverage in page:
+            if recipe in recipes:
+                recipes[recipe].coverage = round(coverage, 2)
+                results.append(recipes[recipe])
+        return self.get_paginated_response(PantryRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        ).data)
+
 
+def lock_user_recipes(user, recipes):
+    FoodgramUser.objects.select_for_update().filter(pk=user.pk).exists()
+    return set(recipes.lock())
+
+
+@transaction.atomic
 def delete_method(user, recipe, model):
-    if not model.objects.filter(user=user,
-                                recipe=recipe).exists():
+    lock_user_recipes(user, Recipe.objects.filter(pk=recipe.pk))
+    entries = model.objects.filter(user=user, recipe=recipe)
+    if model is ShoppingCart:
+        ShoppingCartLine.objects.remove_carts(user, entries)
+    deleted, _ = entries.delete()
+    if not deleted:
         return Response(status=status.HTTP_400_BAD_REQUEST)
-    model.objects.filter(user=user, recipe=recipe).delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def post_method(user, recipe, model):
-    if model.objects.filter(user=user, recipe=recipe).exists():
+def post_method(user, recipe, model, **fields):
+    try:
+        with transaction.atomic():
+            lock_user_recipes(user, Recipe.objects.filter(pk=recipe.pk))
+            model.objects.create(user=user, recipe=recipe, **fields)
+            if model is ShoppingCart:
+                ShoppingCartLine.objects.add_carts(
+                    user, model.objects.filter(user=user, recipe=recipe)
+                )
+    except IntegrityError:
         return Response(status=status.HTTP_400_BAD_REQUEST)
-    model.objects.create(user=user, recipe=recipe)
-    return Response(FavoriteSerializer(recipe).data,
+    return Response({**FavoriteSerializer(recipe).data, **fields},
                     status=status.HTTP_201_CREATED)
 
 
+@transaction.atomic
+def quantity_method(user, recipe, quantity):
+    lock_user_recipes(user, Recipe.objects.filter(pk=recipe.pk))
+    cart = ShoppingCart.objects.filter(user=user, recipe=recipe).first()
+    if cart is None:
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+    if cart.quantity != quantity:
+        ShoppingCartLine.objects.change_amounts([user.id], {
+            ingredient: amount * (quantity - cart.quantity)
+            for ingredient, amount in recipe_amounts([recipe]).items()
+        })
+        cart.quantity = quantity
+        cart.save(update_fields=['quantity', 'modified'])
+    return Response({**FavoriteSerializer(recipe).data, 'quantity': quantity})
+
+
 @api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def favorite(request, pk):
@@ -79,19 +191,115 @@ def favorite(request, pk):
     return post_method(request.user, recipe, Favorite)
 
 
-@api_view(['POST', 'DELETE'])
+@api_view(['POST', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def shopping_cart(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
     if request.method == 'DELETE':
         return delete_method(request.user, recipe, ShoppingCart)
-    return post_method(request.user, recipe, ShoppingCart)
+    serializer = (
+        CartQuantityUpdateSerializer if request.method == 'PATCH'
+        else CartQuantitySerializer
+    )(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    quantity = serializer.validated_data['quantity']
+    if request.method == 'PATCH':
+        return quantity_method(request.user, recipe, quantity)
+    return post_method(request.user, recipe, ShoppingCart, quantity=quantity)
+
+
+@transaction.atomic
+def bulk_post_method(user, ids, model):
+    recipes = lock_user_recipes(user, Recipe.objects.filter(id__in=ids))
+    present = set(model.objects.filter(
+        user=user, recipe__in=ids
+    ).values_list('recipe', flat=True))
+    added = [id for id in ids if id in recipes and id not in present]
+    model.objects.bulk_create([
+        model(user=user, recipe_id=id) for id in added
+    ], ignore_conflicts=True)
+    if added:
+        Recipe.objects.filter(id__in=added).change_counter(
+            COUNTERS[model], 1
+        )
+        if model is ShoppingCart:
+            ShoppingCartLine.objects.add_carts(
+                user, model.objects.filter(user=user, recipe__in=added)
+            )
+    return Response({'results': [
+        {'id': id,
+         'status': 'exists' if id in present
+         else 'added' if id in recipes else 'not_found'}
+        for id in ids
+    ]})
+
+
+@transaction.atomic
+def bulk_delete_method(user, ids, model):
+    lock_user_recipes(user, Recipe.objects.filter(id__in=ids))
+    entries = model.objects.filter(user=user, recipe__in=ids)
+    removed = set(entries.values_list('recipe', flat=True))
+    if removed:
+        if model is ShoppingCart:
+            ShoppingCartLine.objects.remove_carts(user, entries)
+        entries.delete()
+    return Response({'results': [
+        {'id': id, 'status': 'removed' if id in removed else 'absent'}
+        for id in ids
+    ]})
+
+
+def bulk_method(request, model):
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['recipes']
+    if request.method == 'DELETE':
+        return bulk_delete_method(request.user, ids, model)
+    return bulk_post_method(request.user, ids, model)
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def favorites(request):
+    return bulk_method(request, Favorite)
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def shopping_carts(request):
+    return bulk_method(request, ShoppingCart)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+@transaction.atomic
+def clear_shopping_cart(request):
+    lock_user_recipes(request.user, Recipe.objects.filter(
+        id__in=request.user.cart_user.values('recipe')
+    ))
+    request.user.cart_user.all().delete()
+    request.user.cart_lines.all().delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def set_recipes_preview(request, authors):
+    serializer = RecipesLimitSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    limit = serializer.validated_data['recipes_limit']
+    recipes = {author.id: [] for author in authors}
+    if limit:
+        for recipe in Recipe.objects.latest_by_author(authors, limit):
+            recipes[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipes_preview = recipes[author.id]
+    return authors
 
 
 class SubscriptionsViewSet(viewsets.ModelViewSet):
     serializer_class = SubscribeSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = SetPagination
+    cursor_ordering = 'username'
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -99,47 +307,92 @@ class SubscriptionsViewSet(viewsets.ModelViewSet):
         return context
 
     def get_queryset(self):
-        return FoodgramUser.objects.filter(subscribing__user=self.request.user)
+        return FoodgramUser.objects.filter(
+            subscribing__user=self.request.user
+        ).annotate(recipes_count=Count('recipes')).order_by('username')
+
+    def paginate_queryset(self, queryset):
+        return set_recipes_preview(
+            self.request, super().paginate_queryset(queryset)
+        )
 
     def destroy(self, request, *args, **kwargs):
         author = get_object_or_404(FoodgramUser, pk=self.kwargs.get("pk"))
-        if not Subscribe.objects.filter(user=request.user,
-                                        author=author).exists():
+        deleted, _ = Subscribe.objects.filter(
+            user=request.user, author=author
+        ).delete()
+        if not deleted:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        Subscribe.objects.filter(user=request.user, author=author).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def create(self, request, *args, **kwargs):
         author = get_object_or_404(FoodgramUser, pk=self.kwargs.get("pk"))
-        Subscribe.objects.create(user=request.user, author=author)
+        try:
+            with transaction.atomic():
+                Subscribe.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        author = self.get_queryset().get(pk=author.pk)
+        set_recipes_preview(request, [author])
         serializer = SubscribeSerializer(author, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+def cart_stats(user):
+    return {
+        **user.cart_lines.aggregate(count=Count('id'),
+                                    modified=Max('modified')),
+        'ingredients': get_version('ingredients'),
+    }
+
+
+def cart_lines(user):
+    return user.cart_lines.values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ).order_by('ingredient__name')
+
+
+def cart_etag(renderer, cart):
+    return '"{}"'.format(md5(
+        f'{renderer.format}:{cart["count"]}:{cart["modified"]}:'
+        f'{cart["ingredients"]}'.encode()
+    ).hexdigest())
+
+
+def cart_response(renderer, cart, etag, lines):
+    response = StreamingHttpResponse(
+        renderer.stream(merge_lines(lines)),
+        status=status.HTTP_200_OK,
+        content_type=renderer.media_type if renderer.charset is None
+        else f'{renderer.media_type}; charset={renderer.charset}',
+        headers={
+            'Content-Disposition':
+                f'attachment; filename="shop-list.{renderer.format}"',
+            'Cache-Control': 'private, no-cache',
+            'ETag': etag,
+        }
+    )
+    if cart['count']:
+        response['Last-Modified'] = http_date(
+            cart['modified'].timestamp()
+        )
+    return response
+
+
 class CartViewSet(APIView):
     permission_classes = [IsAuthenticated]
-    pagination_class = SetPagination
+    renderer_classes = [TextShoppingListRenderer, CSVShoppingListRenderer,
+                        JSONShoppingListRenderer, PDFShoppingListRenderer]
 
     def get(self, request):
-        recipes_id = request.user.cart_user.values_list('recipe__id')
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=recipes_id
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).order_by('ingredient__name').annotate(sum_amount=Sum('amount'))
-        data = []
-        data.append('список покупок')
-        data.append('ингридиент (ед.) - количество')
-        for i in ingredients:
-            i_name = i.get('ingredient__name')
-            i_unit = i.get('ingredient__measurement_unit')
-            data.append(f'{i_name} ({i_unit}) - {i.get("sum_amount")}')
-        return HttpResponse(
-            '\r\n'.join(data),
-            status=status.HTTP_200_OK,
-            headers={
-                'Content-Type': 'text/plain',
-                'Content-Disposition': 'attachment; filename="shop-list.txt"'
-            }
+        renderer = request.accepted_renderer
+        cart = cart_stats(request.user)
+        etag = cart_etag(renderer, cart)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return cart_response(
+            renderer, cart, etag, cart_lines(request.user).iterator()
         )
@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartLine, Tag)
+from users.models import FoodgramUser, Subscribe
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def users(db):
+    return [
+        FoodgramUser.objects.create_user(
+            email=f'user{number}@example.com', username=f'user{number}',
+            password='password', first_name='Имя', last_name='Фамилия'
+        ) for number in range(4)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=f'продукт {number}',
+                                  measurement_unit='г')
+        for number in range(8)
+    ]
+
+
+@pytest.fixture
+def recipes(users, ingredients):
+    tags = [
+        Tag.objects.create(name=f'тег {number}', slug=f'tag{number}',
+                           color=f'#00000{number}')
+        for number in range(3)
+    ]
+    recipes = []
+    for number in range(12):
+        recipe = Recipe.objects.create(
+            author=users[number % len(users)], name=f'рецепт {number}',
+            text='текст', cooking_time=10, image='recipes/image.png'
+        )
+        recipe.tags.set(tags[:number % len(tags) + 1])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(number + offset) % len(ingredients)],
+                amount=10 * (offset + 1)
+            ) for offset in range(3)
+        ])
+        recipes.append(recipe)
+    Subscribe.objects.create(user=users[0], author=users[1])
+    Favorite.objects.create(user=users[0], recipe=recipes[1])
+    ShoppingCart.objects.create(user=users[0], recipe=recipes[2])
+    ShoppingCartLine.objects.add_carts(
+        users[0], ShoppingCart.objects.filter(user=users[0])
+    )
+    return recipes
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(users):
+    client = APIClient()
+    client.force_authenticate(users[0])
+    return client
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
+
 from dotenv import load_dotenv
 
 
@@ -26,7 +28,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = [os.getenv('HOST'), '127.0.0.1', 'localhost']
 
@@ -39,12 +41,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
     'djoser',
     'corsheaders',
-    'drf_extra_fields',
     'api',
     'recipes',
     'users',
@@ -81,6 +83,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -92,7 +95,19 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
 }
 
@@ -153,6 +168,7 @@ DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
         'user': 'api.serializers.AuthorSerializer',
+        'current_user': 'api.serializers.AuthorSerializer',
     },
     'PERMISSIONS': {
         'user': ['djoser.permissions.CurrentUserOrAdminOrReadOnly'],
@@ -162,6 +178,36 @@ DJOSER = {
 
 MAX_LENGTH = 150
 
+PAGINATION_EXACT_COUNT_LIMIT = 10000
+
+RECIPES_LIMIT = 3
+RECIPES_LIMIT_MAX = 50
+
+INGREDIENT_SEARCH_INDEX = True
+INGREDIENT_SEARCH_LIMIT = 20
+
+PANTRY_INDEX_TTL = timedelta(hours=1)
+PANTRY_INGREDIENTS_MAX = 100
+
+BULK_RECIPES_MAX = 100
+CART_QUANTITY_MAX = 100
+
+IMAGE_RENDITIONS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+IMAGE_QUALITY = 80
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_MAX_AGE = 60 * 10
+RECIPE_CACHE_TIMEOUT = 60 * 60
+
 CORS_URLS_REGEX = r'^/api/.*$'
 
 CORS_ALLOWED_ORIGINS = [
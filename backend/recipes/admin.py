@@ -1,46 +1,129 @@
+from contextlib import contextmanager
+
 from django.contrib import admin
-from django.db.models import Count
+from django.db import transaction
+from django.utils import timezone
 
+from api.pagination import EstimatedCountPaginator
 from recipes.models import (Ingredient, Tag, Recipe, ShoppingCart,
-                            Favorite, RecipeIngredient)
+                            ShoppingCartLine, Favorite, RecipeIngredient,
+                            recipe_amounts)
+
+
+@contextmanager
+def cart_lines_kept(recipes):
+    with transaction.atomic():
+        before = {
+            recipe: recipe_amounts([recipe])
+            for recipe in Recipe.objects.filter(pk__in=recipes).lock()
+        }
+        yield
+        Recipe.objects.filter(pk__in=before).update(modified=timezone.now())
+        for recipe, amounts in before.items():
+            after = recipe_amounts([recipe])
+            ShoppingCartLine.objects.change_recipe_amounts(recipe, {
+                ingredient: after.get(ingredient, 0) - amounts.get(
+                    ingredient, 0
+                ) for ingredient in amounts.keys() | after.keys()
+            })
+
+
+class ScaledAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug', 'color')
+    search_fields = ('name', 'slug')
+
+
+@admin.register(Favorite)
+class UserRecipeAdmin(ScaledAdmin):
+    list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    search_fields = ('=user__username', '=recipe__name')
+    ordering = ('-id',)
 
 
-admin.site.register(Tag)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+@admin.register(ShoppingCart)
+class ShoppingCartAdmin(UserRecipeAdmin):
+    list_display = ('id', 'user', 'recipe', 'quantity')
+
+    def save_model(self, request, obj, form, change):
+        users = {obj.user_id}
+        if change:
+            users.add(form.initial['user'])
+        super().save_model(request, obj, form, change)
+        ShoppingCartLine.objects.rebuild(users)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        ShoppingCartLine.objects.rebuild([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        users = set(queryset.values_list('user', flat=True))
+        super().delete_queryset(request, queryset)
+        ShoppingCartLine.objects.rebuild(users)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
     min_num = 1
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'author', 'name', 'in_favorite')
-    list_filter = ('tags', 'author', 'name')
-    search_fields = ('name',)
-    ordering = ('author',)
+class RecipeAdmin(ScaledAdmin):
+    list_display = ('id', 'author', 'name', 'favorites_count', 'cart_count')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    autocomplete_fields = ('author', 'tags')
+    search_fields = ('name', '=author__username')
+    ordering = ('-id',)
     inlines = [
         RecipeIngredientInline,
     ]
 
-    def in_favorite(self, obj):
-        result = Favorite.objects.filter(recipe=obj).aggregate(Count("recipe"))
-        return result["recipe__count"]
+    def save_related(self, request, form, formsets, change):
+        with cart_lines_kept([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScaledAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name',)
     search_fields = ('name',)
     ordering = ('name',)
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(ScaledAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
-    list_filter = ('recipe',)
-    search_fields = ('recipe', 'ingredient')
-    ordering = ('id',)
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient', 'recipe')
+    search_fields = ('=recipe__name', 'ingredient__name')
+    ordering = ('-id',)
+
+    def save_model(self, request, obj, form, change):
+        recipes = {obj.recipe_id}
+        if change:
+            recipes.add(form.initial['recipe'])
+        with cart_lines_kept(recipes):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with cart_lines_kept([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with cart_lines_kept(set(queryset.values_list('recipe', flat=True))):
+            super().delete_queryset(request, queryset)
@@ -0,0 +1,124 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+renditions_created = Signal()
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': settings.IMAGE_QUALITY, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': settings.IMAGE_QUALITY, 'optimize': True,
+                      'progressive': True}),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS or 1,
+    thread_name_prefix='renditions'
+)
+
+
+def rendition_name(name, size, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'recipes/renditions/{stem}_{size}.{extension}'
+
+
+def rendition_url(recipe, size, extension='jpeg'):
+    renditions = recipe.image_renditions or {}
+    if renditions.get('source') == recipe.image.name and size in renditions:
+        return default_storage.url(renditions[size][extension])
+    return recipe.image.url if recipe.image else None
+
+
+def rendition_urls(recipe):
+    renditions = recipe.image_renditions or {}
+    if renditions.get('source') != recipe.image.name:
+        return {}
+    return {
+        size: {extension: default_storage.url(name)
+               for extension, name in renditions[size].items()}
+        for size in settings.IMAGE_RENDITIONS if size in renditions
+    }
+
+
+def save_image(image, name, extension):
+    image_format, options = FORMATS[extension]
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def make_renditions(recipe_id, source):
+    previous = Recipe.objects.filter(pk=recipe_id).values_list(
+        'image_renditions', flat=True
+    ).first() or {}
+    with default_storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    renditions = {'source': source}
+    sizes = sorted(settings.IMAGE_RENDITIONS.items(),
+                   key=lambda item: item[1], reverse=True)
+    for size, bounds in sizes:
+        image.thumbnail(bounds, Image.Resampling.LANCZOS)
+        renditions[size] = {
+            extension: save_image(
+                image, rendition_name(source, size, extension), extension
+            )
+            for extension in FORMATS
+        }
+    if not Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_renditions=renditions
+    ):
+        delete_renditions(renditions)
+        return
+    renditions_created.send(sender=Recipe, recipe=recipe_id)
+    delete_renditions(previous, keep=rendition_names(renditions))
+
+
+def rendition_names(renditions):
+    return {
+        name for size, names in (renditions or {}).items()
+        if size != 'source' for name in names.values()
+    }
+
+
+def delete_renditions(renditions, keep=frozenset()):
+    for name in rendition_names(renditions) - keep:
+        default_storage.delete(name)
+
+
+def try_renditions(recipe_id, source):
+    try:
+        make_renditions(recipe_id, source)
+    except Exception:
+        logger.exception('Failed to make renditions of %s', source)
+
+
+def run_renditions(recipe_id, source):
+    try:
+        try_renditions(recipe_id, source)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(recipe_id, source):
+    if not settings.IMAGE_WORKERS:
+        try_renditions(recipe_id, source)
+        return
+    executor.submit(run_renditions, recipe_id, source)
@@ -1,16 +1,122 @@
 import csv
+import json
+import os
+import re
+from io import StringIO
+from itertools import islice
+from time import monotonic
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from recipes.models import Ingredient
+from recipes.signals import ingredients_changed
+
+
+DEFAULT_PATH = os.path.join(
+    settings.BASE_DIR, 'recipes', 'data', 'ingredients.csv'
+)
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_json_items(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON-файл должен содержать массив')
+    position = 1
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('JSON-файл обрывается или повреждён')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8') as file:
+        if path.endswith('.json'):
+            for item in read_json_items(file):
+                yield item['name'], item['measurement_unit']
+        else:
+            for name, measurement_unit in csv.reader(file):
+                yield name, measurement_unit
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def insert_rows(rows):
+    Ingredient.objects.bulk_create([
+        Ingredient(name=name, measurement_unit=measurement_unit)
+        for name, measurement_unit in rows
+    ], ignore_conflicts=True)
+
+
+@transaction.atomic
+def copy_rows(rows):
+    buffer = StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE ingredient_import '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+        cursor.copy_expert(
+            'COPY ingredient_import FROM STDIN WITH (FORMAT csv)', buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {Ingredient._meta.db_table} '
+            '(name, measurement_unit) '
+            'SELECT name, measurement_unit FROM ingredient_import '
+            'ON CONFLICT DO NOTHING'
+        )
 
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=[DEFAULT_PATH])
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='загрузка через COPY (только PostgreSQL)'
+        )
+
     def handle(self, *args, **options):
-        with open('recipes/data/ingredients.csv', encoding='utf-8') as i:
-            reader = csv.reader(i)
-            for row in reader:
-                name, measurement_unit = row
-                Ingredient.objects.get_or_create(
-                    name=name, measurement_unit=measurement_unit
-                )
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY поддерживается только в PostgreSQL')
+        load = copy_rows if options['copy'] else insert_rows
+        start = monotonic()
+        before = Ingredient.objects.count()
+        seen = set()
+        total = 0
+        for path in options['paths']:
+            for chunk in chunks(read_rows(path), options['batch_size']):
+                total += len(chunk)
+                rows = set(chunk) - seen
+                seen.update(rows)
+                load(rows)
+                self.stdout.write(f'{path}: обработано строк {total}')
+        ingredients_changed.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {Ingredient.objects.count() - before} '
+            f'из {total} строк за {monotonic() - start:.2f} с'
+        ))
@@ -0,0 +1,35 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='пересоздать копии для всех рецептов'
+        )
+
+    def handle(self, *args, **options):
+        start = monotonic()
+        total = 0
+        recipes = Recipe.objects.exclude(image='').values_list(
+            'id', 'image', 'image_renditions'
+        ).order_by('id')
+        for recipe, image, renditions in recipes.iterator():
+            if not options['all'] and renditions.get('source') == image:
+                continue
+            try:
+                make_renditions(recipe, image)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{image}: {error}')
+                continue
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {total} за {monotonic() - start:.2f} с'
+        ))
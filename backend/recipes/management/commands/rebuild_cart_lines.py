@@ -0,0 +1,34 @@
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingCartLine
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок пользователей по их корзинам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list(
+            'id', flat=True
+        ).iterator()
+        fixed = 0
+        while True:
+            batch = list(islice(users, options['batch_size']))
+            if not batch:
+                break
+            with transaction.atomic():
+                batch = list(User.objects.select_for_update().filter(
+                    id__in=batch
+                ).order_by('id').values_list('id', flat=True))
+                fixed += ShoppingCartLine.objects.rebuild(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено пользователей: {fixed}'
+        ))
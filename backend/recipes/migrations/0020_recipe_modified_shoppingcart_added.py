@@ -0,0 +1,25 @@
+# Generated by Django 4.1.4 on 2026-10-18 07:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_alter_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='дата добавления'),
+            preserve_default=False,
+        ),
+    ]
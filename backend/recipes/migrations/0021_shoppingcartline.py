@@ -0,0 +1,49 @@
+# Generated by Django 4.1.4 on 2026-10-18 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_cart_lines(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingCartLine = apps.get_model('recipes', 'ShoppingCartLine')
+    lines = ShoppingCart.objects.filter(
+        recipe__ingredient_recipe__isnull=False
+    ).values(
+        'user', 'recipe__ingredient_recipe__ingredient'
+    ).order_by().annotate(
+        total=models.Sum('recipe__ingredient_recipe__amount')
+    )
+    ShoppingCartLine.objects.bulk_create([
+        ShoppingCartLine(
+            user_id=line['user'],
+            ingredient_id=line['recipe__ingredient_recipe__ingredient'],
+            amount=line['total']
+        ) for line in lines.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0020_recipe_modified_shoppingcart_added'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartLine',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='ингридиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_lines', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartline',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='ingredient_user_unique'),
+        ),
+        migrations.RunPython(fill_cart_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def dedup_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartLine = apps.get_model('recipes', 'ShoppingCartLine')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).order_by().annotate(keep=Min('id'), total=Count('id')).filter(
+        total__gt=1
+    )
+    for duplicate in duplicates:
+        keep = duplicate['keep']
+        extra = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(id=keep).values_list('id', flat=True))
+        RecipeIngredient.objects.filter(ingredient__in=extra).update(
+            ingredient=keep
+        )
+        for line in ShoppingCartLine.objects.filter(ingredient__in=extra):
+            kept, created = ShoppingCartLine.objects.get_or_create(
+                user_id=line.user_id, ingredient_id=keep,
+                defaults={'amount': 0}
+            )
+            kept.amount += line.amount
+            kept.save()
+            line.delete()
+        Ingredient.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0022_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedup_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Count, F, Max, Sum
+
+
+def dedup_favorites(apps, schema_editor):
+    Favorite = apps.get_model('recipes', 'Favorite')
+    duplicates = Favorite.objects.values('user', 'recipe').order_by().annotate(
+        keep=Max('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        Favorite.objects.filter(
+            user=duplicate['user'], recipe=duplicate['recipe']
+        ).exclude(id=duplicate['keep']).delete()
+
+
+def dedup_shopping_cart(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartLine = apps.get_model('recipes', 'ShoppingCartLine')
+    duplicates = ShoppingCart.objects.values(
+        'user', 'recipe'
+    ).order_by().annotate(keep=Max('id'), total=Count('id')).filter(
+        total__gt=1
+    )
+    for duplicate in duplicates:
+        ShoppingCart.objects.filter(
+            user=duplicate['user'], recipe=duplicate['recipe']
+        ).exclude(id=duplicate['keep']).delete()
+        amounts = RecipeIngredient.objects.filter(
+            recipe=duplicate['recipe']
+        ).values('ingredient').order_by().annotate(total=Sum('amount'))
+        for amount in amounts:
+            ShoppingCartLine.objects.filter(
+                user=duplicate['user'], ingredient=amount['ingredient']
+            ).update(amount=F('amount') - amount['total'] * (
+                duplicate['total'] - 1
+            ))
+    ShoppingCartLine.objects.filter(amount__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0024_ingredient_name_measurement_unit_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedup_favorites, migrations.RunPython.noop),
+        migrations.RunPython(dedup_shopping_cart, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.4 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+def fill_modified(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingCart.objects.update(modified=models.F('added'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0030_recipe_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='quantity',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='количество порций'),
+        ),
+        migrations.RunPython(fill_modified, migrations.RunPython.noop),
+    ]
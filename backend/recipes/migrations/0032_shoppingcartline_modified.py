@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0031_shoppingcart_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcartline',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения'),
+        ),
+    ]
@@ -1,6 +1,15 @@
+from itertools import groupby
+from operator import itemgetter
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models
+from django.db.models import (Case, Count, Exists, F, OuterRef, Prefetch,
+                              Subquery, Sum, Value, When, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
 from django.conf import settings
+from django.utils import timezone
 
 from recipes.validators import validate_name, validate_hex
 
@@ -30,11 +39,91 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                name='name_measurement_unit_unique',
+                fields=['name', 'measurement_unit'],
+            ),
+        ]
 
     def __str__(self):
         return f'''{self.name} - {self.measurement_unit}'''
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_recipe',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def with_user_flags(self, user):
+        queryset = self.select_related('author')
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def lock(self):
+        return list(self.select_for_update().order_by('pk').values_list(
+            'pk', flat=True
+        ))
+
+    def change_counter(self, field, delta):
+        queryset = self if delta > 0 else self.filter(**{f'{field}__gt': 0})
+        return queryset.update(**{field: F(field) + delta})
+
+    def reconcile_counters(self):
+        actual = {
+            'favorites_count': Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).order_by()
+                .values('recipe').annotate(total=Count('id'))
+                .values('total')
+            ), 0),
+            'cart_count': Coalesce(Subquery(
+                ShoppingCart.objects.filter(recipe=OuterRef('pk')).order_by()
+                .values('recipe').annotate(total=Count('id'))
+                .values('total')
+            ), 0),
+        }
+        stale = list(self.annotate(
+            actual_favorites=actual['favorites_count'],
+            actual_cart=actual['cart_count'],
+        ).exclude(
+            favorites_count=F('actual_favorites'),
+            cart_count=F('actual_cart'),
+        ).values_list('id', flat=True))
+        if stale:
+            Recipe.objects.filter(id__in=stale).update(**actual)
+        return len(stale)
+
+    def latest_by_author(self, authors, limit):
+        ranked = self.filter(author__in=authors).annotate(
+            recipe_rank=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=F('id').desc()
+            )
+        ).order_by().values('id', 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE recipe_rank <= %s',
+            (*params, limit)
+        ))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -46,6 +135,8 @@ class Recipe(models.Model):
                             validators=[validate_name])
     image = models.ImageField(upload_to='recipes/',
                               verbose_name='изображение блюда')
+    image_renditions = models.JSONField(default=dict, blank=True,
+                                        editable=False)
     text = models.TextField(verbose_name='текст рецепта')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='время приготовления',
@@ -58,12 +149,43 @@ class Recipe(models.Model):
         blank=False
     )
 
+    modified = models.DateTimeField(auto_now=True, db_index=True,
+                                    verbose_name='дата изменения')
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='в избранном'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='в списках покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                name='recipe_popular_idx',
+                fields=['-favorites_count', '-id'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if connection.vendor != 'postgresql' or (
+            update_fields is not None
+            and not {'name', 'text'} & set(update_fields)
+        ):
+            return
+        Recipe.objects.filter(pk=self.pk).update(search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector('text', weight='B', config='russian')
+        ))
+
 
 class RecipeIngredient(models.Model):
     ingredient = models.ForeignKey(
@@ -82,6 +204,14 @@ class RecipeIngredient(models.Model):
         verbose_name='количество',
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                name='recipe_ingredient_idx',
+                fields=['recipe', 'ingredient'],
+            ),
+        ]
+
     def __str__(self):
         return f'''рецепт {self.recipe}
                    ингридиент {self.ingredient} количество {self.amount}'''
@@ -100,6 +230,14 @@ class Favorite(models.Model):
         verbose_name='любимый рецепт',
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='favorite_user_recipe_unique',
+                fields=['user', 'recipe'],
+            ),
+        ]
+
 
 class ShoppingCart(models.Model):
     user = models.ForeignKey(
@@ -113,3 +251,141 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='рецепт для покупки',
     )
+    added = models.DateTimeField(auto_now_add=True,
+                                 verbose_name='дата добавления')
+    modified = models.DateTimeField(auto_now=True,
+                                    verbose_name='дата изменения')
+    quantity = models.PositiveSmallIntegerField(
+        default=1, verbose_name='количество порций'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='cart_user_recipe_unique',
+                fields=['user', 'recipe'],
+            ),
+        ]
+
+
+class ShoppingCartLineQuerySet(models.QuerySet):
+    def change_amounts(self, users, amounts):
+        amounts = {
+            ingredient: amount for ingredient, amount in amounts.items()
+            if amount
+        }
+        if not amounts:
+            return
+        users = list(users)
+        if not users:
+            return
+        self.bulk_create([
+            ShoppingCartLine(user_id=user, ingredient_id=ingredient, amount=0)
+            for user in users
+            for ingredient, amount in amounts.items() if amount > 0
+        ], ignore_conflicts=True)
+        self.filter(user__in=users, ingredient__in=amounts).update(
+            amount=F('amount') + Case(
+                *[When(ingredient=ingredient, then=Value(amount))
+                  for ingredient, amount in amounts.items()],
+                default=Value(0)
+            ),
+            modified=timezone.now()
+        )
+        self.filter(user__in=users, amount__lte=0).delete()
+
+    def change_recipe_amounts(self, recipe, amounts):
+        if not amounts:
+            return
+        carts = ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'quantity', 'user'
+        ).order_by('quantity')
+        for quantity, users in groupby(carts, key=itemgetter(0)):
+            self.change_amounts([user for _, user in users], {
+                ingredient: amount * quantity
+                for ingredient, amount in amounts.items()
+            })
+
+    def add_carts(self, user, carts):
+        self.change_amounts([user.id], cart_amounts(carts))
+
+    def remove_carts(self, user, carts):
+        self.change_amounts([user.id], {
+            ingredient: -amount
+            for ingredient, amount in cart_amounts(carts).items()
+        })
+
+    def rebuild(self, users):
+        users = list(users)
+        expected = {
+            (user, ingredient): total
+            for user, ingredient, total in RecipeIngredient.objects.filter(
+                recipe__shoppingcart__user__in=users
+            ).values('recipe__shoppingcart__user', 'ingredient').order_by(
+            ).annotate(
+                total=Sum(F('amount') * F('recipe__shoppingcart__quantity'))
+            ).values_list('recipe__shoppingcart__user', 'ingredient', 'total')
+            if total > 0
+        }
+        actual = {
+            (user, ingredient): amount
+            for user, ingredient, amount in self.filter(
+                user__in=users
+            ).values_list('user', 'ingredient', 'amount')
+        }
+        stale = {user for (user, _), _ in expected.items() ^ actual.items()}
+        if stale:
+            self.filter(user__in=stale).delete()
+            self.bulk_create([
+                ShoppingCartLine(user_id=user, ingredient_id=ingredient,
+                                 amount=amount)
+                for (user, ingredient), amount in expected.items()
+                if user in stale
+            ])
+        return len(stale)
+
+
+def cart_amounts(carts):
+    return dict(RecipeIngredient.objects.filter(
+        recipe__shoppingcart__in=carts
+    ).values('ingredient').order_by().annotate(
+        total=Sum(F('amount') * F('recipe__shoppingcart__quantity'))
+    ).values_list('ingredient', 'total'))
+
+
+def recipe_amounts(recipes):
+    if not recipes:
+        return {}
+    return dict(RecipeIngredient.objects.filter(recipe__in=recipes).values(
+        'ingredient'
+    ).order_by().annotate(
+        total=Sum('amount')
+    ).values_list('ingredient', 'total'))
+
+
+class ShoppingCartLine(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_lines',
+        verbose_name='пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='ингридиент',
+    )
+    amount = models.IntegerField(verbose_name='количество')
+    modified = models.DateTimeField(auto_now=True,
+                                    verbose_name='дата изменения')
+
+    objects = ShoppingCartLineQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='ingredient_user_unique',
+                fields=['user', 'ingredient'],
+            ),
+        ]
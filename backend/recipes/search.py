@@ -0,0 +1,246 @@
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+from datetime import timedelta
+from itertools import groupby, islice, takewhile
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from api.cache import get_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._state = None
+        self._lock = Lock()
+
+    def invalidate(self):
+        self._state = None
+
+    def load(self):
+        version = get_version('ingredients')
+        state = self._state
+        if state is None or state[0] != version:
+            with self._lock:
+                state = self._state
+                if state is None or state[0] != version:
+                    state = self._state = (version, self.build())
+        return state[1]
+
+    def build(self):
+        rows = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        return [row[0] for row in rows], rows
+
+    def search(self, query, limit):
+        return self.find(self.load(), query, limit)
+
+    async def asearch(self, query, limit):
+        return self.find(await sync_to_async(self.load)(), query, limit)
+
+    def find(self, index, query, limit):
+        query = query.lower()
+        keys, rows = index
+        start = bisect_left(keys, query)
+        found = list(islice(
+            takewhile(lambda row: row[0].startswith(query),
+                      islice(rows, start, None)),
+            limit
+        ))
+        if len(found) < limit:
+            found.extend(islice(
+                (row for row in rows
+                 if query in row[0] and not row[0].startswith(query)),
+                limit - len(found)
+            ))
+        return [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for _, pk, name, measurement_unit in found
+        ]
+
+
+def to_bitmap(recipes):
+    if not recipes:
+        return 0
+    buffer = bytearray((recipes[-1] >> 3) + 1)
+    for recipe in recipes:
+        buffer[recipe >> 3] |= 1 << (recipe & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+def iter_bits(bitmap):
+    while bitmap:
+        bit = bitmap.bit_length() - 1
+        yield bit
+        bitmap ^= 1 << bit
+
+
+class PantryRanking(Sequence):
+    def __init__(self, matched, planes, sizes, ingredients):
+        self._matched = matched
+        self._planes = planes
+        self._sizes = sizes
+        self._equal = {}
+        self._length = popcount(matched)
+        largest = min(ingredients, 2 ** len(planes) - 1)
+        self._order = sorted(
+            ((count, size) for count in range(1, largest + 1)
+             for size in sizes if size >= count),
+            key=lambda bucket: (bucket[0] / bucket[1], bucket[0]),
+            reverse=True
+        )
+
+    def __len__(self):
+        return self._length
+
+    def equal(self, count):
+        if count not in self._equal:
+            bitmap = self._matched
+            for bit, plane in enumerate(self._planes):
+                bitmap &= plane if count >> bit & 1 else ~plane
+            self._equal[count] = bitmap
+        return self._equal[count]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self._length)
+        result = []
+        offset = 0
+        for count, size in self._order:
+            if offset >= stop:
+                break
+            bucket = self.equal(count) & self._sizes[size]
+            total = popcount(bucket)
+            if offset + total > start:
+                result.extend(
+                    (recipe, count / size) for recipe in islice(
+                        iter_bits(bucket),
+                        max(start - offset, 0),
+                        stop - offset
+                    )
+                )
+            offset += total
+        return result
+
+
+class PantryIndex:
+    def __init__(self):
+        self._postings = None
+        self._bitmaps = {}
+        self._sizes = {}
+        self._recipes = {}
+        self._built_at = None
+        self._synced_at = None
+        self._lock = Lock()
+
+    def build(self):
+        self._postings = {}
+        self._bitmaps = {}
+        self._recipes = {}
+        self._built_at = self._synced_at = timezone.now()
+        sizes = {}
+        rows = RecipeIngredient.objects.values_list(
+            'recipe', 'ingredient'
+        ).order_by('recipe_id').iterator()
+        for recipe, group in groupby(rows, key=lambda row: row[0]):
+            ingredients = frozenset(row[1] for row in group)
+            self._recipes[recipe] = ingredients
+            sizes.setdefault(len(ingredients), []).append(recipe)
+            for ingredient in ingredients:
+                self._postings.setdefault(
+                    ingredient, array('q')
+                ).append(recipe)
+        self._sizes = {
+            size: to_bitmap(recipes) for size, recipes in sizes.items()
+        }
+
+    def sync(self):
+        now = timezone.now()
+        if (self._postings is None
+                or now - self._built_at > settings.PANTRY_INDEX_TTL):
+            self.build()
+            return
+        changed = set(Recipe.objects.filter(
+            modified__gte=self._synced_at - timedelta(seconds=5)
+        ).values_list('id', flat=True))
+        self._synced_at = now
+        if not changed:
+            return
+        current = {recipe: set() for recipe in changed}
+        for recipe, ingredient in RecipeIngredient.objects.filter(
+            recipe__in=changed
+        ).values_list('recipe', 'ingredient'):
+            current[recipe].add(ingredient)
+        for recipe, ingredients in current.items():
+            self._set(recipe, frozenset(ingredients))
+
+    def _set(self, recipe, ingredients):
+        old = self._recipes.pop(recipe, frozenset())
+        if old == ingredients:
+            if ingredients:
+                self._recipes[recipe] = ingredients
+            return
+        bit = 1 << recipe
+        if old:
+            self._sizes[len(old)] &= ~bit
+        if ingredients:
+            self._recipes[recipe] = ingredients
+            self._sizes[len(ingredients)] = (
+                self._sizes.get(len(ingredients), 0) | bit
+            )
+        for ingredient in old - ingredients:
+            postings = self._postings[ingredient]
+            del postings[bisect_left(postings, recipe)]
+            self._bitmaps.pop(ingredient, None)
+        for ingredient in ingredients - old:
+            insort(self._postings.setdefault(ingredient, array('q')), recipe)
+            self._bitmaps.pop(ingredient, None)
+
+    def bitmap(self, ingredient):
+        if ingredient in self._bitmaps:
+            return self._bitmaps[ingredient]
+        postings = self._postings.get(ingredient)
+        bitmap = to_bitmap(postings)
+        if postings and len(postings) * 64 > postings[-1]:
+            self._bitmaps[ingredient] = bitmap
+        return bitmap
+
+    def remove(self, recipe):
+        with self._lock:
+            if self._postings is not None:
+                self._set(recipe, frozenset())
+
+    def rank(self, ingredients):
+        ingredients = set(ingredients)
+        with self._lock:
+            self.sync()
+            matched = 0
+            planes = []
+            for ingredient in ingredients:
+                carry = self.bitmap(ingredient)
+                matched |= carry
+                for bit, plane in enumerate(planes):
+                    planes[bit], carry = plane ^ carry, plane & carry
+                    if not carry:
+                        break
+                if carry:
+                    planes.append(carry)
+            sizes = dict(self._sizes)
+        return PantryRanking(matched, planes, sizes, len(ingredients))
+
+
+ingredient_index = IngredientIndex()
+pantry_index = PantryIndex()
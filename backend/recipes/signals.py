@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from recipes.images import delete_renditions, schedule_renditions
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartLine, recipe_amounts)
+from recipes.search import ingredient_index, pantry_index
+
+
+ingredients_changed = Signal()
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_cart_lines(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).lock()
+    ShoppingCartLine.objects.change_recipe_amounts(instance, {
+        ingredient: -amount
+        for ingredient, amount in recipe_amounts([instance]).items()
+    })
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_changed, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(sender, instance, **kwargs):
+    pantry_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def make_image_renditions(sender, instance, **kwargs):
+    source = instance.image.name
+    if not source or instance.image_renditions.get('source') == source:
+        return
+    transaction.on_commit(
+        lambda: schedule_renditions(instance.pk, source)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_renditions(sender, instance, **kwargs):
+    renditions = instance.image_renditions
+    transaction.on_commit(lambda: delete_renditions(renditions))
+
+
+COUNTERS = {Favorite: 'favorites_count', ShoppingCart: 'cart_count'}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+            COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+        COUNTERS[sender], -1
+    )
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from recipes.models import (Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingCartLine)
+from recipes.search import PantryIndex
+
+
+def expected_lines(user):
+    return dict(RecipeIngredient.objects.filter(
+        recipe__shoppingcart__user=user
+    ).values('ingredient').order_by().annotate(
+        total=Sum(F('amount') * F('recipe__shoppingcart__quantity'))
+    ).values_list('ingredient', 'total'))
+
+
+def actual_lines(user):
+    return dict(user.cart_lines.values_list('ingredient', 'amount'))
+
+
+def test_rebuild_cart_lines(users, recipes):
+    ShoppingCart.objects.filter(user=users[0]).update(quantity=3)
+    ShoppingCartLine.objects.filter(user=users[0]).update(amount=1)
+    out = StringIO()
+    call_command('rebuild_cart_lines', stdout=out)
+    assert 'Исправлено пользователей: 1' in out.getvalue()
+    assert actual_lines(users[0]) == expected_lines(users[0])
+    out = StringIO()
+    call_command('rebuild_cart_lines', stdout=out)
+    assert 'Исправлено пользователей: 0' in out.getvalue()
+
+
+def test_admin_ingredient_delete_keeps_cart_lines(users, recipes):
+    model_admin = admin.site._registry[RecipeIngredient]
+    row = recipes[2].ingredient_recipe.order_by('id').first()
+    model_admin.delete_queryset(
+        None, RecipeIngredient.objects.filter(id=row.id)
+    )
+    assert actual_lines(users[0]) == expected_lines(users[0])
+
+
+def test_admin_cart_delete_keeps_cart_lines(users, recipes):
+    model_admin = admin.site._registry[ShoppingCart]
+    model_admin.delete_queryset(None, ShoppingCart.objects.filter(
+        user=users[0]
+    ))
+    assert actual_lines(users[0]) == {}
+
+
+def test_admin_ingredient_edit_reaches_pantry_index(recipes, ingredients):
+    index = PantryIndex()
+    index.build()
+    Recipe.objects.update(modified=timezone.now() - timedelta(hours=1))
+    row = recipes[0].ingredient_recipe.order_by('id').first()
+    row.ingredient = ingredients[7]
+    admin.site._registry[RecipeIngredient].save_model(None, row, None, False)
+    assert recipes[0].id in {
+        recipe for recipe, _ in index.rank([ingredients[7].id])
+    }
@@ -0,0 +1,35 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.management.commands import from_csv_to_base
+from recipes.models import Ingredient
+
+ITEMS = [
+    {'name': f'продукт {number}', 'measurement_unit': 'г'}
+    for number in range(50)
+]
+
+
+def test_json_is_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(from_csv_to_base, 'JSON_CHUNK_SIZE', 7)
+    file = StringIO(json.dumps(ITEMS, ensure_ascii=False, indent=1))
+    assert list(from_csv_to_base.read_json_items(file)) == ITEMS
+
+
+def test_truncated_json_is_rejected(monkeypatch):
+    monkeypatch.setattr(from_csv_to_base, 'JSON_CHUNK_SIZE', 7)
+    file = StringIO(json.dumps(ITEMS, ensure_ascii=False)[:-30])
+    with pytest.raises(CommandError):
+        list(from_csv_to_base.read_json_items(file))
+
+
+@pytest.mark.django_db
+def test_load_json_file(tmp_path):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps(ITEMS, ensure_ascii=False), encoding='utf-8')
+    call_command('from_csv_to_base', str(path), stdout=StringIO())
+    call_command('from_csv_to_base', str(path), stdout=StringIO())
+    assert Ingredient.objects.count() == len(ITEMS)
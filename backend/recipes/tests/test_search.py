@@ -0,0 +1,93 @@
+import random
+
+import pytest
+from django.core.cache import cache
+
+from api.cache import bump_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import IngredientIndex, PantryIndex
+from users.models import FoodgramUser
+
+
+def brute_force(recipes, pantry):
+    ranked = []
+    for recipe, ingredients in recipes.items():
+        count = len(ingredients & pantry)
+        if count:
+            ranked.append((recipe, count, count / len(ingredients)))
+    ranked.sort(key=lambda row: (row[2], row[1], row[0]), reverse=True)
+    return [(recipe, coverage) for recipe, _, coverage in ranked]
+
+
+def make_recipes(ingredient_sets):
+    author = FoodgramUser.objects.create_user(
+        email='author@example.com', username='author', password='password'
+    )
+    ingredients = {
+        number: Ingredient.objects.create(name=f'ingredient {number}',
+                                          measurement_unit='г')
+        for number in sorted(set().union(*ingredient_sets))
+    }
+    recipes = {}
+    for number, ingredient_set in enumerate(ingredient_sets):
+        recipe = Recipe.objects.create(
+            author=author, name=f'recipe {number}', text='text',
+            cooking_time=1, image='recipes/image.png'
+        )
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredients[item],
+                             amount=1)
+            for item in ingredient_set
+        ])
+        recipes[recipe.id] = frozenset(
+            ingredients[item].id for item in ingredient_set
+        )
+    return recipes, ingredients
+
+
+@pytest.mark.django_db
+def test_count_above_plane_capacity():
+    recipes, ingredients = make_recipes([
+        {1, 2, 3, 4, 5}, {6, 20, 21, 22, 23}
+    ])
+    first, second = recipes
+    missing = max(ingredient.id for ingredient in ingredients.values())
+    pantry = [ingredients[1].id, ingredients[2].id, ingredients[6].id,
+              missing + 1, missing + 2]
+    ranking = PantryIndex().rank(pantry)
+    assert ranking[0:len(ranking)] == [(first, 0.4), (second, 0.2)]
+
+
+@pytest.mark.django_db
+def test_rank_matches_brute_force():
+    generator = random.Random(14)
+    recipes, ingredients = make_recipes([
+        set(generator.sample(range(1, 40), generator.randint(1, 12)))
+        for _ in range(120)
+    ])
+    index = PantryIndex()
+    for _ in range(50):
+        pantry = {
+            ingredients[item].id for item in generator.sample(
+                sorted(ingredients), generator.randint(1, 30)
+            )
+        }
+        ranking = index.rank(pantry)
+        expected = brute_force(recipes, pantry)
+        assert len(ranking) == len(expected)
+        assert ranking[0:len(ranking)] == expected
+        assert ranking[3:9] == expected[3:9]
+
+
+@pytest.mark.django_db
+def test_ingredient_index_follows_shared_version():
+    cache.clear()
+    Ingredient.objects.create(name='молоко', measurement_unit='мл')
+    index = IngredientIndex()
+    assert [item.name for item in index.search('мол', 10)] == ['молоко']
+    Ingredient.objects.bulk_create([
+        Ingredient(name='молоко топлёное', measurement_unit='мл')
+    ])
+    assert len(index.search('мол', 10)) == 1
+    bump_version('ingredients')
+    assert len(index.search('мол', 10)) == 2
@@ -0,0 +1,28 @@
+import pytest
+
+from recipes.units import merge_lines, merge_units
+
+
+@pytest.mark.parametrize('rows, expected', [
+    ([('г', 500), ('кг', 2)], [('г', 2500)]),
+    ([('мл', 10), ('ст. л.', 2), ('ч. л.', 1)], [('мл', 45)]),
+    ([('ст. л.', 2), ('ч. л.', 1)], [('ч. л.', 7)]),
+    ([('л', 1), ('ст. л.', 2)], [('мл', 1030)]),
+    ([('щепотка', 2)], [('щепотка', 2)]),
+    ([('шт.', 1), ('шт.', 2)], [('шт.', 3)]),
+    ([('кг', 2)], [('кг', 2)]),
+    ([('ст. л.', 3)], [('ст. л.', 3)]),
+    ([('г', 100), ('мл', 50)], [('г', 100), ('мл', 50)]),
+])
+def test_merge_units(rows, expected):
+    assert sorted(merge_units(rows)) == expected
+
+
+def test_merge_lines():
+    assert list(merge_lines([
+        ('мука', 'г', 200), ('мука', 'кг', 1),
+        ('соль', 'ч. л.', 1), ('соль', 'щепотка', 1),
+    ])) == [
+        ('мука', 'г', 1200),
+        ('соль', 'ч. л.', 1), ('соль', 'щепотка', 1),
+    ]
@@ -0,0 +1,38 @@
+from itertools import groupby
+from operator import itemgetter
+
+
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+}
+
+
+def merge_units(rows):
+    families = {}
+    for unit, amount in rows:
+        base, factor = UNITS.get(unit.strip().lower(), (unit, 1))
+        families.setdefault(base, []).append((unit, factor, amount))
+    for base, units in families.items():
+        if len(units) == 1:
+            unit, _, amount = units[0]
+            yield unit, amount
+            continue
+        unit, factor, _ = min(units, key=itemgetter(1))
+        if any(other % factor for _, other, _ in units):
+            unit, factor = base, 1
+        yield unit, sum(
+            other * amount for _, other, amount in units
+        ) // factor
+
+
+def merge_lines(lines):
+    for name, rows in groupby(lines, key=itemgetter(0)):
+        for unit, amount in sorted(merge_units(
+            (unit, amount) for _, unit, amount in rows
+        )):
+            yield name, unit, amount
@@ -1,16 +1,29 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from api.pagination import EstimatedCountPaginator
 from users.models import FoodgramUser, Subscribe
 
 
 class UserAdmin(UserAdmin):
     model = FoodgramUser
     list_display = ('id', 'email', 'username')
-    list_filter = ('email', 'username')
+    list_filter = ('is_staff', 'is_active')
     search_fields = ('email', 'username')
     ordering = ('username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Subscribe)
+class SubscribeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(FoodgramUser, UserAdmin)
-admin.site.register(Subscribe)